@@ -0,0 +1,49 @@
+"""
+Playwright screenshot helper for LLTimmy
+`capture()` is the one page routine behind every Playwright screenshot: tools.py calls
+it on pages of its shared in-process browser, and `python -m _pw_shot` runs it under the
+venv interpreter when Playwright is only installed there. As an imported module its
+bytecode is cached in __pycache__ instead of being recompiled on every call.
+URL/destination/ready-selector travel via PW_* env vars, never string embedding (Critic #6)
+"""
+import asyncio
+import os
+
+VIEWPORT = {"width": 1280, "height": 900}
+
+
+def is_jpeg(path: str) -> bool:
+    """Screenshot format follows the destination's extension (PNG unless .jpg/.jpeg)."""
+    return path.lower().endswith((".jpg", ".jpeg"))
+
+
+async def capture(page, url: str, dest: str, selector: str = "body"):
+    """Load `url` in `page` and write a full-page screenshot to `dest`."""
+    await page.goto(url, wait_until="domcontentloaded", timeout=8000)
+    await page.wait_for_selector(selector, state="visible", timeout=5000)
+    try:
+        # Web fonts usually settle in a few hundred ms; never wait long for them
+        await asyncio.wait_for(page.evaluate("document.fonts.ready.then(() => true)"), 1.5)
+    except asyncio.TimeoutError:
+        pass
+    # Playwright infers PNG/JPEG from the extension; JPEG encodes far cheaper
+    if is_jpeg(dest):
+        await page.screenshot(path=dest, full_page=True, quality=70)
+    else:
+        await page.screenshot(path=dest, full_page=True)
+
+
+async def shot():
+    # Imported here so tools.py can use capture() without Playwright in-process
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page(viewport=VIEWPORT)
+        await capture(page, os.environ["PW_URL"], os.environ["PW_DEST"],
+                      os.environ.get("PW_SELECTOR", "body"))
+        await browser.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(shot())
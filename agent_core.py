@@ -173,7 +173,7 @@ AVAILABLE TOOLS:
 - write_clipboard: Write content to macOS clipboard. {{"content": "text to copy"}}
 - scaffold_project: Create a complete project from template. {{"project_type": "blender_addon|blender_script|comfyui_node|website|python_package|react_app|nextjs_app", "name": "MyProject", "dest_dir": "~/Desktop"}}
 - terminal_command_stream: Run a long command with live output (builds, renders, training). {{"command": "npm install", "timeout": 300}}
-- capture_screenshot: Take a screenshot for debugging. {{"target": "desktop|timmy|doctor|<url>", "save_path": "optional_path.png"}}
+- capture_screenshot: Take a screenshot for debugging. {{"target": "desktop|timmy|doctor|<url>", "save_path": "optional_path.png", "format": "optional png|jpg"}}
 - search_memory: Search your memory (subconscious + conscious). {{"query": "search terms", "n": 5}}
 - add_task: Create a task in the task manager. {{"title": "...", "description": "...", "urgency": "critical|high|normal|low", "schedule": "now|idle|scheduled"}}
 - list_tasks: List all tasks in the task manager. {{}}
@@ -556,7 +556,7 @@ class AgentCore:
             "terminal_command_stream": lambda p: self.tools.terminal_command_stream(
                 p.get("command", ""), stream_callback=self._stream_line_callback,
                 timeout=p.get("timeout", 300)),
-            "capture_screenshot": lambda p: self.tools.capture_screenshot(p.get("target", "desktop"), p.get("save_path")),
+            "capture_screenshot": lambda p: self.tools.capture_screenshot(p.get("target", "desktop"), p.get("save_path"), p.get("format")),
             "search_memory": lambda p: self._search_memory(p),
             "add_task": lambda p: self._add_task(p),
             "list_tasks": lambda p: self._list_tasks(p),
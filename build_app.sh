@@ -56,6 +56,7 @@ if "$VENV_PYTHON" -c "import PyInstaller" 2>/dev/null; then
         --add-data "agent_core.py:." \
         --add-data "memory_manager.py:." \
         --add-data "tools.py:." \
+        --add-data "_pw_shot.py:." \
         --add-data "task_manager.py:." \
         --add-data "scheduler.py:." \
         --add-data "self_evolution.py:." \
@@ -1882,6 +1882,11 @@ class LLTimmyApp(ctk.CTk):
             except Exception:
                 pass
         evolution.stop_idle_research()
+        # Shut down the shared headless browser on the agent loop
+        try:
+            asyncio.run_coroutine_threadsafe(tools.close(), _loop).result(timeout=5)
+        except Exception:
+            pass
         self.destroy()
 
 
@@ -147,6 +147,24 @@ async def run_tests():
     else:
         result("List Tasks", "FAIL", f"Resp: {resp[:100]}")
 
+    # Test 11: Zip Slip through a symlink already inside dest (direct tool call, no LLM)
+    print("\n--- Test 11: Zip Slip via Symlink ---", flush=True)
+    import shutil, tempfile, zipfile
+    zroot = Path(tempfile.mkdtemp(prefix="timmy_zip_r14_"))
+    (zroot / "outside").mkdir()
+    (zroot / "dest").mkdir()
+    (zroot / "dest" / "link").symlink_to(zroot / "outside")
+    with zipfile.ZipFile(zroot / "evil.zip", "w") as zf:
+        zf.writestr("link/pwned.txt", "escaped")
+    out, err = await tools.extract_zip(str(zroot / "evil.zip"), str(zroot / "dest"))
+    if (zroot / "outside" / "pwned.txt").exists():
+        result("Zip Slip via Symlink", "FAIL", "File written outside dest through symlink")
+    elif "BLOCKED" in err:
+        result("Zip Slip via Symlink", "PASS", "Symlinked member blocked")
+    else:
+        result("Zip Slip via Symlink", "PARTIAL", f"Not written, but not blocked: {out or err}")
+    shutil.rmtree(zroot)
+
     # Summary
     print("\n" + "="*70)
     total = PASS + FAIL + PARTIAL
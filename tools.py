@@ -4,21 +4,166 @@ All tools executed via the ReAct loop. Every call logged to tim_audit.log.
 """
 import os
 import json
+import uuid
+import asyncio
+import atexit
 import subprocess
+import threading
 import zipfile
 import logging
+import py_compile
 import requests
 import shutil
+import shlex
 import base64
+import codecs
+import errno
+import importlib
 import re
+import string
+import sys
+import time
+from bisect import insort
+from collections import OrderedDict, deque
 from datetime import datetime, date
+from itertools import count, islice
+from operator import itemgetter
 from typing import Dict, Tuple, List, Optional
 from pathlib import Path
+from urllib.parse import urlsplit
+
+from _pw_shot import VIEWPORT as _PW_VIEWPORT, capture as _pw_capture, is_jpeg as _is_jpeg
 
 logger = logging.getLogger(__name__)
 
+# Optional heavy dependencies — imported once here, checked at each call site
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+# lxml's C parser is several times faster than the pure-Python html.parser backend
+try:
+    import lxml  # noqa: F401
+    _BS4_PARSER = "lxml"
+except ImportError:
+    _BS4_PARSER = "html.parser"
+try:
+    from duckduckgo_search import DDGS
+except ImportError:
+    DDGS = None
+try:
+    from playwright.async_api import async_playwright
+except ImportError:
+    async_playwright = None
+try:
+    import websockets
+except ImportError:
+    websockets = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
+
+
+def _json_loads(data):
+    """Parse JSON text/bytes, using orjson when installed (several times faster on large docs)."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _json_dumps_compact(obj) -> str:
+    """Single-line JSON without separator padding; orjson when installed and able."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:
+            pass  # e.g. non-str dict keys, which json.dumps coerces
+    return json.dumps(obj, separators=(",", ":"))
+
+
 CURRENT_YEAR = datetime.now().year
 
+# Playwright screenshot helper module (see _pw_shot.py), also run as `python -m _pw_shot`
+# from this directory for the venv-only case so its compiled bytecode is reused
+_PW_SHOT_MODULE = "_pw_shot"
+_MODULE_DIR = str(Path(__file__).resolve().parent)
+
+# Gradio's live-update sockets keep `networkidle` from settling; its root container
+# becoming visible is the real "rendered" signal for the Timmy/Doctor UIs
+_GRADIO_READY_SELECTOR = ".gradio-container"
+
+# Bounds of the first on-screen window titled argv[1] (browsers may append " - <App>"),
+# printed as "x,y,w,h" for `screencapture -R`; empty output when no window matches
+_WINDOW_BOUNDS_SCRIPT = """on run argv
+    set t to item 1 of argv
+    tell application "System Events"
+        repeat with p in (every process whose background only is false)
+            repeat with w in (windows of p)
+                try
+                    set n to name of w
+                    if n is t or n starts with (t & " - ") or n starts with (t & " — ") then
+                        set {x, y} to position of w
+                        set {ww, hh} to size of w
+                        return (x as text) & "," & y & "," & ww & "," & hh
+                    end if
+                end try
+            end repeat
+        end repeat
+    end tell
+    return ""
+end run"""
+
+
+def _fast_write(path: str, data: bytes):
+    """Write bytes with raw os.open/os.write — no TextIOWrapper/BufferedWriter layers."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+# Name sanitizers for create_tool / scaffold_project
+_SAFE_NAME_RE = re.compile(r"[^a-zA-Z0-9_]")
+_SNAKE_RE = re.compile(r"[^a-z0-9_]+")
+
+# Backslash/quote escaping for strings embedded in AppleScript literals (one C pass)
+_APPLESCRIPT_ESCAPE = str.maketrans({"\\": "\\\\", '"': '\\"'})
+
+# Anything the shell would interpret (pipes, redirects, globs, $vars, ~, comments, lists)
+_SHELL_META_RE = re.compile(r"[|&;<>()$`*?\[\]{}~#\n]")
+# exec() failures /bin/sh handles itself: not found, no shebang (runs it as a script), not executable
+_SHELL_FALLBACK_ERRNOS = (errno.ENOENT, errno.ENOEXEC, errno.EACCES)
+# Line breaks in streamed command output, including bare \r progress redraws
+_LINE_BREAK_RE = re.compile(r"\r\n|\r|\n")
+
+
+def _plain_argv(command: str) -> Optional[List[str]]:
+    """argv for `command` if it can be exec'd directly without /bin/sh, else None."""
+    if _SHELL_META_RE.search(command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+    # Leading VAR=value assignments need the shell
+    if not argv or "=" in argv[0]:
+        return None
+    return argv
+
+
+# classify_risk helpers, compiled once at import
+_PIPE_SHELL_RE = re.compile(r'\|\s*(sh|bash|zsh|python|perl|ruby|node)\b')
+_SYSTEM_DIR_RE = re.compile(r"\s+/System|\s+/Library")
+_SAFE_IO_RE = re.compile(r"^(echo|cat|printf|tee)\b")
+# First word of every pipeline stage (empty stages such as `a || b` yield nothing)
+_PIPE_HEADS_RE = re.compile(r"(?:^|\|)\s*([^\s|]+)")
+
 # ---------------------------------------------------------------------------
 # Smart Risk Engine
 # ---------------------------------------------------------------------------
@@ -26,31 +171,34 @@ class RiskEngine:
     BANNED_PATHS = ["/System", "/Library", "~/Library", "/usr"]
 
     HIGH_RISK = [
-        (r"\brm\s+-rf\b", "Recursive force delete"),
-        (r"\bsudo\s+rm\b", "Root-level delete"),
-        (r"\bdd\s+if=", "Raw disk write"),
-        (r"\bmkfs\b", "Filesystem format"),
-        (r"\bfdisk\b", "Disk partition"),
-        (r"\bshutdown\b", "System shutdown"),
-        (r"\breboot\b", "System reboot"),
-        (r"\bsudo\s+chmod\b", "Root permission change"),
-        (r"\bsudo\s+chown\b", "Root ownership change"),
-        (r"\brm\s+-r\s+/", "Delete from root"),
-        (r"\bnewfs\b", "New filesystem"),
-        (r"\bdiskutil\s+erase", "Disk erase"),
+        (re.compile(r"\brm\s+-rf\b"), "Recursive force delete"),
+        (re.compile(r"\bsudo\s+rm\b"), "Root-level delete"),
+        (re.compile(r"\bdd\s+if="), "Raw disk write"),
+        (re.compile(r"\bmkfs\b"), "Filesystem format"),
+        (re.compile(r"\bfdisk\b"), "Disk partition"),
+        (re.compile(r"\bshutdown\b"), "System shutdown"),
+        (re.compile(r"\breboot\b"), "System reboot"),
+        (re.compile(r"\bsudo\s+chmod\b"), "Root permission change"),
+        (re.compile(r"\bsudo\s+chown\b"), "Root ownership change"),
+        (re.compile(r"\brm\s+-r\s+/"), "Delete from root"),
+        (re.compile(r"\bnewfs\b"), "New filesystem"),
+        (re.compile(r"\bdiskutil\s+erase"), "Disk erase"),
     ]
 
     MEDIUM_RISK = [
-        (r"\bpip\s+install\b", "Package install"),
-        (r"\bnpm\s+install\b", "NPM install"),
-        (r"\bbrew\s+install\b", "Homebrew install"),
-        (r"\bgit\s+push\b", "Git push"),
-        (r"\bcurl\b.*\|\s*sh", "Pipe curl to shell"),
-        (r"\bwget\b.*\|\s*sh", "Pipe wget to shell"),
+        (re.compile(r"\bpip\s+install\b"), "Package install"),
+        (re.compile(r"\bnpm\s+install\b"), "NPM install"),
+        (re.compile(r"\bbrew\s+install\b"), "Homebrew install"),
+        (re.compile(r"\bgit\s+push\b"), "Git push"),
+        (re.compile(r"\bcurl\b.*\|\s*sh"), "Pipe curl to shell"),
+        (re.compile(r"\bwget\b.*\|\s*sh"), "Pipe wget to shell"),
     ]
 
+    # One alternation over both tiers: a single scan rejects the (common) no-hit case
+    _RISK_ANY = re.compile("|".join(p.pattern for p, _ in HIGH_RISK + MEDIUM_RISK))
+
     # NOTE: curl/wget removed from SAFE_PREFIXES to prevent curl|bash bypass (Critic #14)
-    SAFE_PREFIXES = [
+    SAFE_PREFIXES = frozenset({
         "ls", "cat", "echo", "printf", "mkdir", "touch", "cp", "mv",
         "head", "tail", "wc", "grep", "find", "which", "pwd", "cd",
         "date", "whoami", "hostname", "uname", "env", "python",
@@ -62,60 +210,80 @@ class RiskEngine:
         "ping", "ssh", "scp", "git", "brew", "npm", "npx",
         "pip", "pip3", "cargo", "go", "ruby", "swift", "clang",
         "gcc", "make", "cmake", "java", "javac",
-    ]
+    })
 
     # Commands that look scary in patterns but are safe in context
-    SAFE_PIPE_COMMANDS = [
+    SAFE_PIPE_COMMANDS = frozenset({
         "grep", "sort", "uniq", "wc", "head", "tail", "awk", "sed",
         "tr", "cut", "tee", "less", "more", "xargs", "jq",
-    ]
+    })
+    _SAFE_ALL = SAFE_PREFIXES | SAFE_PIPE_COMMANDS
+
+    def __init__(self):
+        # $HOME doesn't change at runtime: expand, escape and compile banned-path checks once
+        expanded_home = os.path.expanduser("~")
+        # Expanded BANNED_PATHS, same order — usable directly with str.startswith
+        self.banned_prefixes = tuple(b.replace("~", expanded_home) for b in self.BANNED_PATHS)
+        self._banned = []
+        for banned, expanded in zip(self.BANNED_PATHS, self.banned_prefixes):
+            escaped = re.escape(expanded)
+            self._banned.append((
+                banned,
+                re.compile(rf"(^|\s)(rm|mv|cp|chmod|chown|ln)\s.*{escaped}"),
+                re.compile(rf">\s*{escaped}"),
+            ))
 
     def classify_risk(self, command: str) -> Tuple[str, str]:
         cmd_stripped = command.strip()
-        first_word = cmd_stripped.split()[0] if cmd_stripped.split() else ""
+        head = cmd_stripped.split(None, 1)
+        first_word = head[0] if head else ""
 
         # HIGH risk patterns checked FIRST (Critic #14: prevents safe-prefix bypass)
-        for pattern, desc in self.HIGH_RISK:
-            if re.search(pattern, command):
-                return "high", f"Dangerous: {desc}"
-
-        # MEDIUM risk patterns checked before safe prefix
-        for pattern, desc in self.MEDIUM_RISK:
-            if re.search(pattern, command):
-                return "medium", f"Caution: {desc}"
+        # Safe-prefix commands still need this scan (`git push`, `find ... -exec rm -rf`).
+        # On a hit, walk the lists in order so the reported desc stays the first listed match
+        if self._RISK_ANY.search(command):
+            for pattern, desc in self.HIGH_RISK:
+                if pattern.search(command):
+                    return "high", f"Dangerous: {desc}"
+
+            # MEDIUM risk patterns checked before safe prefix
+            for pattern, desc in self.MEDIUM_RISK:
+                if pattern.search(command):
+                    return "medium", f"Caution: {desc}"
 
         # Pipe-to-shell check BEFORE safe prefix (BUG-16: prevents cat|sh bypass)
         if "|" in command:
-            if re.search(r'\|\s*(sh|bash|zsh|python|perl|ruby|node)\b', command):
+            if _PIPE_SHELL_RE.search(command):
                 return "high", "Piped to shell/interpreter — dangerous."
 
         # Safe prefix check
         if first_word in self.SAFE_PREFIXES:
-            if first_word == "cp" and re.search(r"\s+/System|\s+/Library", cmd_stripped):
+            if first_word == "cp" and _SYSTEM_DIR_RE.search(cmd_stripped):
                 return "medium", "Copy to system directory."
-            if first_word == "mv" and re.search(r"\s+/System|\s+/Library", cmd_stripped):
+            if first_word == "mv" and _SYSTEM_DIR_RE.search(cmd_stripped):
                 return "high", "Move to system directory."
             return "low", "Safe command."
 
         # Piped commands: check if entire pipeline is safe
         if "|" in command:
-            parts = [p.strip().split()[0] for p in command.split("|") if p.strip()]
-            if all(p in self.SAFE_PREFIXES or p in self.SAFE_PIPE_COMMANDS for p in parts):
+            heads = _PIPE_HEADS_RE.findall(command)
+            if all(h in self._SAFE_ALL for h in heads):
                 return "low", "Safe piped command."
 
         # File read/write via safe patterns
-        if re.match(r"^(echo|cat|printf|tee)\b", cmd_stripped):
+        if _SAFE_IO_RE.match(cmd_stripped):
             return "low", "File I/O via safe command."
 
         return "low", "Command appears safe."
 
     def check_banned_paths(self, command: str) -> Tuple[bool, str]:
-        expanded_home = os.path.expanduser("~")
-        for banned in self.BANNED_PATHS:
-            expanded = banned.replace("~", expanded_home)
-            if re.search(rf"(^|\s)(rm|mv|cp|chmod|chown|ln)\s.*{re.escape(expanded)}", command):
+        # Both regexes end in the literal expanded path; no substring hit means no match
+        if not any(p in command for p in self.banned_prefixes):
+            return True, ""
+        for banned, target_re, write_re in self._banned:
+            if target_re.search(command):
                 return False, f"Banned path target: {banned}"
-            if re.search(rf">\s*{re.escape(expanded)}", command):
+            if write_re.search(command):
                 return False, f"Write to banned path: {banned}"
         return True, ""
 
@@ -129,29 +297,31 @@ class SourceEvaluator:
         "stackoverflow.com", "github.com", "arxiv.org", "wikipedia.org",
         "docs.google.com", "learn.microsoft.com",
     }
+    _BONUS_SUFFIXES = (".edu", ".gov")
+    # Case-insensitive so URLs/snippets need no lowercased copies
+    _KW_RE = re.compile(r"official|docs|documentation", re.IGNORECASE)
+    _NEG_RE = re.compile(r"not true|myth|incorrect|debunked", re.IGNORECASE)
 
     @classmethod
     def evaluate(cls, results: List[Dict]) -> List[Dict]:
         for r in results:
-            score = 50
             url = r.get("url", "")
-            parts = url.split("/")
-            domain = parts[2] if len(parts) > 2 else ""
-            if domain in cls.TRUSTED:
-                score += 30
-            if any(k in url.lower() for k in ("official", "docs", "documentation")):
-                score += 10
-            if domain.endswith((".edu", ".gov")):
-                score += 20
+            # hostname drops user-info/port and lowercases, so "GitHub.com:443" still counts
+            try:
+                domain = urlsplit(url).hostname or ""
+            except ValueError:
+                domain = ""
+            score = (
+                50
+                + (30 if domain in cls.TRUSTED else 0)
+                + (20 if domain.endswith(cls._BONUS_SUFFIXES) else 0)
+                + (10 if cls._KW_RE.search(url) else 0)
+            )
             r["confidence"] = min(score, 100)
-        results.sort(key=lambda x: x.get("confidence", 0), reverse=True)
+        results.sort(key=itemgetter("confidence"), reverse=True)
 
         if len(results) >= 3:
-            snippets = [r.get("snippet", "").lower() for r in results[:3]]
-            negations = sum(
-                1 for s in snippets
-                if any(w in s for w in ["not true", "myth", "incorrect", "debunked"])
-            )
+            negations = sum(1 for r in results[:3] if cls._NEG_RE.search(r.get("snippet", "")))
             if negations >= 2:
                 for r in results:
                     r["bullshit_flag"] = True
@@ -168,30 +338,94 @@ class ToolsSystem:
         self.projects_dir = Path.home() / "LLTimmy" / "projects" / "sandbox"
         self.projects_dir.mkdir(parents=True, exist_ok=True)
         self.audit_log = Path.home() / "LLTimmy" / "tim_audit.log"
+        self._audit_fh = None  # opened on first log_tool_call, kept for the process lifetime
+        self._screenshots_dir = Path.home() / "LLTimmy" / "screenshots"
+        self._screenshots_dir.mkdir(parents=True, exist_ok=True)
+        self._shot_counter = count()  # with time_ns, keeps same-second screenshot names unique
         # Resolve venv Python path dynamically (not hardcoded)
         _venv_path = Path(__file__).parent / ".venv" / "bin" / "python3"
-        import sys
         self._venv_python = str(_venv_path) if _venv_path.exists() else sys.executable
+        # Resolve helper binaries once so each exec skips the $PATH walk
+        self._tool_paths = {
+            name: shutil.which(name) or name
+            for name in ("open", "pbcopy", "pbpaste", "osascript", "screencapture", "mdfind", "git")
+        }
+        # Shared HTTP session: keep-alive reuses sockets across tool calls and ComfyUI polls
+        self._http = requests.Session()
+        # Browser UA as a session default (the scrape fallbacks need it; APIs don't mind)
+        self._http.headers["User-Agent"] = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)"
+        adapter = requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=20)
+        self._http.mount("http://", adapter)
+        self._http.mount("https://", adapter)
+        # DDGS client reused across searches (created lazily; calls run in worker threads)
+        self._ddgs = None
+        self._ddgs_lock = threading.Lock()
+        # Epoch second until which GitHub reported the API quota as spent (X-RateLimit-Reset)
+        self._github_reset_at = 0.0
+        # Window title -> (time.monotonic() of lookup, "x,y,w,h"), see _window_region
+        self._window_bounds_cache: Dict[str, Tuple[float, str]] = {}
+        # Opened pygit2 repositories by path, reused across github_operations pushes
+        self._git_repos: Dict[str, "pygit2.Repository"] = {}
+        # Headless Chromium shared across playwright_browser calls (launched lazily)
+        self._pw = None
+        self._browser = None
+        self._browser_lock = asyncio.Lock()
+        # App bundle listings per search dir: dir -> (st_mtime_ns, names, lowercase index)
+        self._apps_cache: Dict[str, Tuple[int, set, Dict[str, str]]] = {}
+        # Recently-missed paths -> time.monotonic() of the miss, in LRU order (see _stat_cached)
+        self._neg_path_cache: "OrderedDict[str, float]" = OrderedDict()
+
+    async def close(self):
+        """Release long-lived resources (browser, HTTP pool). Call once at shutdown."""
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                logger.debug(f"Browser close failed: {e}")
+            self._browser = None
+        if self._pw is not None:
+            try:
+                await self._pw.stop()
+            except Exception as e:
+                logger.debug(f"Playwright stop failed: {e}")
+            self._pw = None
+        self._http.close()
+        self._ddgs = None
+        if self._audit_fh is not None:
+            self._audit_fh.close()
+            self._audit_fh = None
 
     # Sensitive keys to redact from audit log (Critic #8)
-    _SENSITIVE_KEYS = {"token", "password", "secret", "api_key", "authorization"}
+    _SENSITIVE_KEYS = frozenset({"token", "password", "secret", "api_key", "authorization"})
+
+    # Audit timestamps are second-resolution; reformat only when the second changes
+    _ts_cache_time: int = 0
+    _ts_cache_str: str = ""
 
     def log_tool_call(self, tool: str, params: Dict, result: str):
         # Redact sensitive params before logging
-        safe_params = {}
-        for k, v in params.items():
-            if k.lower() in self._SENSITIVE_KEYS:
-                safe_params[k] = "[REDACTED]"
-            else:
-                safe_params[k] = v
+        sensitive = self._SENSITIVE_KEYS
+        safe_params = {
+            k: ("[REDACTED]" if k in sensitive or k.lower() in sensitive else v)
+            for k, v in params.items()
+        }
+        now = int(time.time())
+        if now != self._ts_cache_time:
+            self._ts_cache_str = datetime.fromtimestamp(now).isoformat()
+            self._ts_cache_time = now
         entry = {
-            "ts": datetime.now().isoformat(),
+            "ts": self._ts_cache_str,
             "tool": tool,
             "params": safe_params,
             "result": result[:500],
         }
-        with open(self.audit_log, "a", encoding="utf-8") as f:
-            f.write(json.dumps(entry) + "\n")
+        fh = self._audit_fh
+        if fh is None:
+            fh = self._audit_fh = open(self.audit_log, "a", buffering=8192, encoding="utf-8")
+            atexit.register(fh.close)
+        fh.write(_json_dumps_compact(entry) + "\n")
+        # Doctor and the debug panel tail this file live, so push each entry out now
+        fh.flush()
 
     # ---- terminal_command ------------------------------------------------
     async def terminal_command(self, command: str) -> Tuple[str, str]:
@@ -215,9 +449,19 @@ class ToolsSystem:
             )
 
         try:
-            proc = subprocess.run(
-                command, shell=True, capture_output=True, text=True, timeout=120,
-            )
+            # Simple commands skip the intermediate /bin/sh. Builtins/unknown names, shebang-less
+            # scripts and unexecutable files fall back to it for the shell's behaviour and messages
+            argv = _plain_argv(command)
+            try:
+                if argv is None:
+                    raise FileNotFoundError
+                proc = subprocess.run(argv, capture_output=True, text=True, timeout=120)
+            except OSError as e:
+                if e.errno not in _SHELL_FALLBACK_ERRNOS:
+                    raise
+                proc = subprocess.run(
+                    command, shell=True, capture_output=True, text=True, timeout=120,
+                )
             output = (proc.stdout + proc.stderr).strip()
             self.log_tool_call("terminal_command", {"command": command}, output)
             return output or "(completed, no output)", ""
@@ -264,49 +508,29 @@ class ToolsSystem:
             if not p.exists():
                 return "", f"File not found: {p}"
             if p.is_dir():
-                # List directory contents instead of failing
-                entries = sorted(p.iterdir())
+                # List directory contents instead of failing. DirEntry.is_dir() answers
+                # from the dirent type, so only symlinks cost an extra stat
+                with os.scandir(p) as it:
+                    entries = sorted(it, key=lambda e: e.name)
                 listing = "\n".join(
                     f"{'[DIR] ' if e.is_dir() else ''}{e.name}"
                     for e in entries[:50]
                 )
                 return f"'{p}' is a directory. Contents:\n{listing}", ""
-            content = p.read_text(encoding="utf-8")
-            return content[:5000], ""
+            # Read only what we return — never materialize a huge file to slice it
+            with p.open("r", encoding="utf-8") as f:
+                content = f.read(5000)
+            return content, ""
         except Exception as e:
             return "", f"Read error: {e}"
 
     # ---- web_search (fixed -- real results, current date) -----------------
-    async def web_search(self, query: str, num_results: int = 5) -> Tuple[str, str]:
-        results = []
+    # How long a preferred backend may still finish after a less-preferred one
+    # has already returned results (DDG library > DDG HTML > Google)
+    _SEARCH_PREFERENCE_WINDOW = 0.3
 
-        try:
-            from duckduckgo_search import DDGS
-            with DDGS() as ddgs:
-                raw = list(ddgs.text(query, max_results=num_results))
-            results = [
-                {
-                    "title": r.get("title", ""),
-                    "url": r.get("href", ""),
-                    "snippet": r.get("body", ""),
-                    "source": "duckduckgo",
-                }
-                for r in raw
-            ]
-        except Exception as e:
-            logger.warning(f"DDG library failed: {e}")
-
-        if not results:
-            try:
-                results = self._fallback_ddg_search(query, num_results)
-            except Exception as e:
-                logger.warning(f"DDG fallback failed: {e}")
-
-        if not results:
-            try:
-                results = self._fallback_google_search(query, num_results)
-            except Exception as e:
-                logger.warning(f"Google fallback failed: {e}")
+    async def web_search(self, query: str, num_results: int = 5) -> Tuple[str, str]:
+        results = await self._race_searches(query, num_results)
 
         if not results:
             return "", f"All search methods failed for: {query}"
@@ -315,15 +539,82 @@ class ToolsSystem:
         self.log_tool_call("web_search", {"query": query}, f"{len(results)} results")
         return json.dumps(results, indent=2, ensure_ascii=False), ""
 
+    async def _race_searches(self, query: str, n: int) -> List[Dict]:
+        """Run every search backend concurrently and return the first usable result set.
+
+        A slow-but-failing primary no longer delays the fallbacks; preference
+        order is kept by giving better-ranked backends a short grace window.
+        """
+        searches = (
+            ("DDG library", self._ddg_search),
+            ("DDG fallback", self._fallback_ddg_search),
+            ("Google fallback", self._fallback_google_search),
+        )
+        pending = {
+            asyncio.ensure_future(asyncio.to_thread(fn, query, n)): (rank, label)
+            for rank, (label, fn) in enumerate(searches)
+        }
+        found: Dict[int, List[Dict]] = {}
+
+        def _harvest(done):
+            for task in done:
+                rank, label = pending.pop(task)
+                try:
+                    res = task.result()
+                except Exception as e:
+                    logger.warning(f"{label} failed: {e}")
+                    continue
+                if res:
+                    found[rank] = res
+
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                _harvest(done)
+                if not found:
+                    continue
+                preferred = [t for t, (rank, _) in pending.items() if rank < min(found)]
+                if preferred:
+                    done, _ = await asyncio.wait(preferred, timeout=self._SEARCH_PREFERENCE_WINDOW)
+                    _harvest(done)
+                return found[min(found)]
+            return []
+        finally:
+            # Threads can't be interrupted; cancelling just drops their results
+            for task in pending:
+                task.cancel()
+
+    def _ddg_search(self, query: str, n: int) -> List[Dict]:
+        if DDGS is None:
+            raise RuntimeError("duckduckgo_search not installed")
+        with self._ddgs_lock:
+            if self._ddgs is None:
+                self._ddgs = DDGS()
+            try:
+                raw = list(self._ddgs.text(query, max_results=n))
+            except Exception:
+                # Don't keep a client that may be rate-limited or half-broken
+                self._ddgs = None
+                raise
+        return [
+            {
+                "title": r.get("title", ""),
+                "url": r.get("href", ""),
+                "snippet": r.get("body", ""),
+                "source": "duckduckgo",
+            }
+            for r in raw
+        ]
+
     def _fallback_ddg_search(self, query: str, n: int) -> List[Dict]:
-        from bs4 import BeautifulSoup
-        resp = requests.get(
+        if BeautifulSoup is None:
+            raise RuntimeError("bs4 not installed")
+        resp = self._http.get(
             "https://html.duckduckgo.com/html/",
             params={"q": query},
-            headers={"User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)"},
             timeout=15,
         )
-        soup = BeautifulSoup(resp.text, "html.parser")
+        soup = BeautifulSoup(resp.text, _BS4_PARSER)
         results = []
         for r in soup.select(".result"):
             title_el = r.select_one(".result__title")
@@ -342,14 +633,14 @@ class ToolsSystem:
         return results[:n]
 
     def _fallback_google_search(self, query: str, n: int) -> List[Dict]:
-        resp = requests.get(
+        if BeautifulSoup is None:
+            raise RuntimeError("bs4 not installed")
+        resp = self._http.get(
             "https://www.google.com/search",
             params={"q": query, "num": n},
-            headers={"User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)"},
             timeout=15,
         )
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(resp.text, "html.parser")
+        soup = BeautifulSoup(resp.text, _BS4_PARSER)
         results = []
         for g in soup.select("div.g"):
             title_el = g.select_one("h3")
@@ -371,61 +662,17 @@ class ToolsSystem:
 
         if service.lower() in ("doctor", "doctor_ui", "doctor ui"):
             port = port or 7861
-            pid_file = Path("/tmp/doctor.pid")
-            # Check PID
-            pid_alive = False
-            if pid_file.exists():
-                try:
-                    pid = int(pid_file.read_text().strip())
-                    os.kill(pid, 0)
-                    pid_alive = True
-                except (ProcessLookupError, ValueError, PermissionError, OSError):
-                    pass
-            # Check HTTP
-            http_alive = False
-            try:
-                resp = requests.get(f"http://127.0.0.1:{port}/", timeout=3)
-                http_alive = resp.status_code == 200
-            except Exception:
-                pass
-            results = {
-                "service": "Doctor",
-                "pid_running": pid_alive,
-                "http_responding": http_alive,
-                "port": port,
-                "status": "ONLINE" if (pid_alive and http_alive) else "OFFLINE",
-            }
+            results = await self._probe_ui_service("Doctor", port, Path("/tmp/doctor.pid"))
 
         elif service.lower() in ("timmy", "timmy_ui", "timmy ui"):
             port = port or 7860
-            pid_file = Path("/tmp/timmy.pid")
-            pid_alive = False
-            if pid_file.exists():
-                try:
-                    pid = int(pid_file.read_text().strip())
-                    os.kill(pid, 0)
-                    pid_alive = True
-                except (ProcessLookupError, ValueError, PermissionError, OSError):
-                    pass
-            http_alive = False
-            try:
-                resp = requests.get(f"http://127.0.0.1:{port}/", timeout=3)
-                http_alive = resp.status_code == 200
-            except Exception:
-                pass
-            results = {
-                "service": "Timmy",
-                "pid_running": pid_alive,
-                "http_responding": http_alive,
-                "port": port,
-                "status": "ONLINE" if (pid_alive and http_alive) else "OFFLINE",
-            }
+            results = await self._probe_ui_service("Timmy", port, Path("/tmp/timmy.pid"))
 
         elif service.lower() in ("ollama",):
             port = port or 11434
             try:
-                resp = requests.get(f"http://localhost:{port}/api/tags", timeout=3)
-                models = [m["name"] for m in resp.json().get("models", [])]
+                resp = await asyncio.to_thread(self._http.get, f"http://localhost:{port}/api/tags", timeout=3)
+                models = [m["name"] for m in _json_loads(resp.content).get("models", [])]
                 results = {
                     "service": "Ollama",
                     "status": "ONLINE",
@@ -439,7 +686,7 @@ class ToolsSystem:
             # Generic port check
             if port:
                 try:
-                    resp = requests.get(f"http://127.0.0.1:{port}/", timeout=3)
+                    resp = await asyncio.to_thread(self._http.get, f"http://127.0.0.1:{port}/", timeout=3)
                     results = {
                         "service": service,
                         "status": "ONLINE" if resp.status_code < 500 else "ERROR",
@@ -454,14 +701,43 @@ class ToolsSystem:
         self.log_tool_call("check_service_status", {"service": service, "port": port}, json.dumps(results))
         return json.dumps(results, indent=2), ""
 
+    @staticmethod
+    def _pid_alive(pid_file: Path) -> bool:
+        try:
+            pid = int(pid_file.read_text().strip())
+            os.kill(pid, 0)
+            return True
+        except (ProcessLookupError, ValueError, PermissionError, OSError):
+            return False
+
+    def _http_ok(self, url: str) -> bool:
+        try:
+            return self._http.get(url, timeout=3).status_code == 200
+        except Exception:
+            return False
+
+    async def _probe_ui_service(self, name: str, port: int, pid_file: Path) -> Dict:
+        """PID and HTTP checks run side by side off the event loop: latency is max(), not sum()."""
+        pid_alive, http_alive = await asyncio.gather(
+            asyncio.to_thread(self._pid_alive, pid_file),
+            asyncio.to_thread(self._http_ok, f"http://127.0.0.1:{port}/"),
+        )
+        return {
+            "service": name,
+            "pid_running": pid_alive,
+            "http_responding": http_alive,
+            "port": port,
+            "status": "ONLINE" if (pid_alive and http_alive) else "OFFLINE",
+        }
+
     # ---- list_ollama_models (NEW: check local models before pulling) ------
     async def list_ollama_models(self) -> Tuple[str, str]:
         """List all models currently available in Ollama."""
         try:
             host = self.config.get("ollama_host", "http://localhost:11434")
-            resp = requests.get(f"{host}/api/tags", timeout=5)
+            resp = await asyncio.to_thread(self._http.get, f"{host}/api/tags", timeout=5)
             resp.raise_for_status()
-            models = resp.json().get("models", [])
+            models = _json_loads(resp.content).get("models", [])
             model_list = []
             for m in models:
                 name = m.get("name", "unknown")
@@ -478,7 +754,8 @@ class ToolsSystem:
         host = self.config.get("ollama_host", "http://localhost:11434")
         if action == "pull":
             try:
-                resp = requests.post(
+                resp = await asyncio.to_thread(
+                    self._http.post,
                     f"{host}/api/pull",
                     json={"name": model_name, "stream": False},
                     timeout=600,
@@ -489,7 +766,8 @@ class ToolsSystem:
                 return "", f"Failed to pull model '{model_name}': {e}"
         elif action == "remove":
             try:
-                resp = requests.delete(
+                resp = await asyncio.to_thread(
+                    self._http.delete,
                     f"{host}/api/delete",
                     json={"name": model_name},
                     timeout=30,
@@ -505,16 +783,15 @@ class ToolsSystem:
     async def playwright_browser(self, url: str) -> Tuple[str, str]:
         # Try Playwright first, then fallback to requests+BS4
         try:
-            from playwright.async_api import async_playwright
-            pw = await async_playwright().start()
-            browser = await pw.chromium.launch(headless=True)
+            browser = await self._get_browser()
             page = await browser.new_page()
-            await page.goto(url, wait_until="domcontentloaded", timeout=30000)
-            title = await page.title()
-            text = await page.inner_text("body")
-            text = text[:5000]
-            await browser.close()
-            await pw.stop()
+            try:
+                await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+                title = await page.title()
+                text = await page.inner_text("body")
+                text = text[:5000]
+            finally:
+                await page.close()
             result = f"Title: {title}\nURL: {url}\n\n{text}"
             self.log_tool_call("playwright_browser", {"url": url}, result[:300])
             return result, ""
@@ -522,37 +799,63 @@ class ToolsSystem:
             logger.warning(f"Playwright failed ({pw_err}), trying requests fallback")
             # Fallback: requests + BeautifulSoup
             try:
-                from bs4 import BeautifulSoup
-                resp = requests.get(
-                    url,
-                    headers={"User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)"},
-                    timeout=15,
-                )
+                if BeautifulSoup is None:
+                    raise ImportError("bs4 not installed")
+                resp = self._http.get(url, timeout=15)
                 resp.raise_for_status()
-                soup = BeautifulSoup(resp.text, "html.parser")
+                soup = BeautifulSoup(resp.text, _BS4_PARSER)
                 # Remove script/style elements
                 for tag in soup(["script", "style", "nav", "footer", "header"]):
                     tag.decompose()
                 title = soup.title.string if soup.title else "No title"
-                text = soup.get_text(separator="\n", strip=True)[:5000]
+                # Same as get_text("\n", strip=True) but stops once the 5000-char cap is hit
+                parts, size = [], 0
+                for chunk in soup.stripped_strings:
+                    parts.append(chunk)
+                    size += len(chunk) + 1
+                    if size >= 5000:
+                        break
+                text = "\n".join(parts)[:5000]
                 result = f"Title: {title}\nURL: {url}\n\n{text}"
                 self.log_tool_call("playwright_browser", {"url": url}, result[:300])
                 return result, ""
             except Exception as req_err:
                 return "", f"Browser error: Playwright({pw_err}), Requests({req_err})"
 
+    async def _get_browser(self):
+        """Launch headless Chromium on first use and reuse it for later calls."""
+        if async_playwright is None:
+            raise ImportError("playwright not installed")
+        async with self._browser_lock:
+            if self._browser is None or not self._browser.is_connected():
+                if self._pw is None:
+                    self._pw = await async_playwright().start()
+                self._browser = await self._pw.chromium.launch(headless=True)
+        return self._browser
+
+    async def _browser_screenshot(self, url: str, dest: str, ready_selector: str = "body"):
+        """_pw_shot.capture() on a fresh page of the shared, already-warm browser."""
+        browser = await self._get_browser()
+        page = await browser.new_page(viewport=_PW_VIEWPORT)
+        try:
+            await _pw_capture(page, url, dest, ready_selector)
+        finally:
+            await page.close()
+
     # ---- download_url ----------------------------------------------------
     async def download_url(self, url: str, dest_dir: str = None) -> Tuple[str, str]:
         try:
             dest = Path(dest_dir) if dest_dir else Path.home() / "Downloads" / "LLTimmy_Projects"
             dest.mkdir(parents=True, exist_ok=True)
-            filename = Path(url).name or f"download_{datetime.now():%Y%m%d%H%M%S}"
+            # Name from the URL path only, so query strings don't leak into the filename
+            filename = Path(urlsplit(url).path).name or f"download_{datetime.now():%Y%m%d%H%M%S}"
             dest_path = dest / filename
-            resp = requests.get(url, stream=True, timeout=60)
+            resp = self._http.get(url, stream=True, timeout=60)
             resp.raise_for_status()
+            # Let urllib3 undo gzip/deflate and copy in C with a 1MiB buffer
+            resp.raw.decode_content = True
             with open(dest_path, "wb") as f:
-                for chunk in resp.iter_content(8192):
-                    f.write(chunk)
+                shutil.copyfileobj(resp.raw, f, length=1 << 20)
             self.log_tool_call("download_url", {"url": url}, str(dest_path))
             return f"Downloaded -> {dest_path} ({dest_path.stat().st_size} bytes)", ""
         except Exception as e:
@@ -564,11 +867,34 @@ class ToolsSystem:
             dest = Path(dest_dir) if dest_dir else self.projects_dir
             dest.mkdir(parents=True, exist_ok=True)
             with zipfile.ZipFile(zip_path, "r") as zf:
-                # Check for path traversal attacks before extracting
+                # Check for path traversal attacks before extracting.
+                # Resolve dest once; members are validated lexically (no per-entry syscalls)
+                dest_resolved = str(dest.resolve())
+                dest_prefix = dest_resolved + os.sep
+
+                def _outside(path: str) -> bool:
+                    return path != dest_resolved and not path.startswith(dest_prefix)
+
+                by_parent: Dict[str, List[Tuple[str, str]]] = {}
                 for member in zf.infolist():
-                    member_path = (dest / member.filename).resolve()
-                    if not str(member_path).startswith(str(dest.resolve())):
+                    target = os.path.normpath(os.path.join(dest_resolved, member.filename))
+                    if _outside(target):
                         return "", f"BLOCKED: Zip path traversal detected in '{member.filename}'. Extraction aborted."
+                    if target != dest_resolved:
+                        by_parent.setdefault(os.path.dirname(target), []).append((target, member.filename))
+                # extractall follows symlinks already inside dest, so resolve each distinct parent
+                # dir once, and each member whose name is an existing symlink in that dir
+                for parent, members in by_parent.items():
+                    if _outside(os.path.realpath(parent)):
+                        return "", f"BLOCKED: Zip path traversal detected in '{members[0][1]}'. Extraction aborted."
+                    try:
+                        with os.scandir(parent) as it:
+                            links = {e.name for e in it if e.is_symlink()}
+                    except OSError:
+                        continue  # not created yet, so nothing in it to follow
+                    for target, name in members:
+                        if os.path.basename(target) in links and _outside(os.path.realpath(target)):
+                            return "", f"BLOCKED: Zip path traversal detected in '{name}'. Extraction aborted."
                 zf.extractall(dest)
             return f"Extracted -> {dest}", ""
         except Exception as e:
@@ -586,12 +912,16 @@ class ToolsSystem:
 
         try:
             if gui:
-                subprocess.Popen(["open", "-a", "Blender"])
+                subprocess.Popen([self._tool_paths["open"], "-a", "Blender"])
                 return "Blender opened (GUI mode).", ""
-            proc = subprocess.run(
-                f'"{blender}" {command}',
-                shell=True, capture_output=True, text=True, timeout=120,
-            )
+            argv = _plain_argv(command)
+            if argv is not None:
+                proc = subprocess.run([blender] + argv, capture_output=True, text=True, timeout=120)
+            else:
+                proc = subprocess.run(
+                    f"{shlex.quote(blender)} {command}",
+                    shell=True, capture_output=True, text=True, timeout=120,
+                )
             output = (proc.stdout + proc.stderr).strip()
             return output or "(completed)", ""
         except Exception as e:
@@ -601,7 +931,7 @@ class ToolsSystem:
     async def run_applescript(self, script: str) -> Tuple[str, str]:
         try:
             proc = subprocess.run(
-                ["osascript", "-e", script],
+                [self._tool_paths["osascript"], "-e", script],
                 capture_output=True, text=True, timeout=30,
             )
             output = (proc.stdout + proc.stderr).strip()
@@ -621,12 +951,11 @@ class ToolsSystem:
                                     workflow_json: dict = None,
                                     poll_timeout: int = 120) -> Tuple[str, str]:
         """Submit a ComfyUI workflow and retrieve output image paths."""
-        import time as _time
         host = "http://localhost:8188"
 
         # 1. Check ComfyUI is alive
         try:
-            requests.get(f"{host}/system_stats", timeout=5)
+            await asyncio.to_thread(self._http.get, f"{host}/system_stats", timeout=5)
         except requests.ConnectionError:
             return "", "ComfyUI not running on localhost:8188. Start it first."
         except Exception as e:
@@ -638,10 +967,10 @@ class ToolsSystem:
             payload = workflow_json
         elif workflow_file:
             p = Path(os.path.expanduser(workflow_file))
-            if not p.exists():
-                return "", f"Workflow file not found: {p}"
             try:
-                payload = json.loads(p.read_text())
+                payload = _json_loads(p.read_bytes())
+            except FileNotFoundError:
+                return "", f"Workflow file not found: {p}"
             except json.JSONDecodeError as e:
                 return "", f"Invalid JSON in workflow file: {e}"
         elif workflow_id:
@@ -652,34 +981,63 @@ class ToolsSystem:
                 Path.home() / "Downloads" / f"{workflow_id}.json",
                 Path.home() / "Desktop" / f"{workflow_id}.json",
             ]
+            # EAFP: one open per candidate, no separate exists() stat
             for sp in search_paths:
-                if sp.exists():
-                    try:
-                        payload = json.loads(sp.read_text())
-                    except json.JSONDecodeError:
-                        continue
+                try:
+                    payload = _json_loads(sp.read_bytes())
                     break
+                except (FileNotFoundError, json.JSONDecodeError):
+                    continue
             if payload is None:
                 return "", f"Workflow '{workflow_id}' not found. Searched: {', '.join(str(s.parent) for s in search_paths)}"
         else:
             return "", "Provide workflow_file, workflow_json, or workflow_id."
 
-        # 3. Queue the prompt
+        # 3. Subscribe to ComfyUI's event stream *before* queueing so the
+        #    completion event can't be missed; fall back to polling without it
+        client_id = uuid.uuid4().hex
+        ws = None
+        if websockets is not None:
+            try:
+                ws = await websockets.connect(f"ws://localhost:8188/ws?clientId={client_id}")
+            except Exception as e:
+                logger.debug(f"ComfyUI websocket unavailable, polling instead: {e}")
+
+        # 4. Queue the prompt
         try:
-            resp = requests.post(f"{host}/prompt", json={"prompt": payload}, timeout=15)
-            if resp.status_code != 200:
-                return "", f"ComfyUI rejected workflow (HTTP {resp.status_code}): {resp.text[:300]}"
-            prompt_id = resp.json().get("prompt_id")
-            if not prompt_id:
-                return "", f"No prompt_id in ComfyUI response: {resp.text[:300]}"
-        except Exception as e:
-            return "", f"ComfyUI queue error: {e}"
+            try:
+                resp = await asyncio.to_thread(
+                    self._http.post, f"{host}/prompt",
+                    json={"prompt": payload, "client_id": client_id}, timeout=15,
+                )
+                if resp.status_code != 200:
+                    return "", f"ComfyUI rejected workflow (HTTP {resp.status_code}): {resp.text[:300]}"
+                prompt_id = resp.json().get("prompt_id")
+                if not prompt_id:
+                    return "", f"No prompt_id in ComfyUI response: {resp.text[:300]}"
+            except Exception as e:
+                return "", f"ComfyUI queue error: {e}"
 
-        # 4. Poll for completion
-        deadline = _time.time() + poll_timeout
-        while _time.time() < deadline:
+            # 5. Block on the "executing" event with node=None (prompt finished)
+            if ws is not None:
+                try:
+                    await asyncio.wait_for(self._wait_comfyui_done(ws, prompt_id), timeout=poll_timeout)
+                except asyncio.TimeoutError:
+                    return "", f"ComfyUI timed out after {poll_timeout}s. prompt_id={prompt_id}"
+                except Exception as e:
+                    logger.warning(f"ComfyUI websocket dropped ({e}), polling history instead")
+        finally:
+            if ws is not None:
+                await ws.close()
+
+        # 6. Fetch results (returns on the first pass when the websocket saw completion)
+        #    Polling backs off from 100ms to 2s so fast prompts return quickly
+        deadline = time.time() + poll_timeout
+        delay = 0.1
+        while time.time() < deadline:
             try:
-                hist = requests.get(f"{host}/history/{prompt_id}", timeout=10).json()
+                resp = await asyncio.to_thread(self._http.get, f"{host}/history/{prompt_id}", timeout=10)
+                hist = resp.json()
                 if prompt_id in hist:
                     outputs = hist[prompt_id].get("outputs", {})
                     image_paths = []
@@ -700,19 +1058,73 @@ class ToolsSystem:
                     return f"Workflow complete (prompt_id={prompt_id}), no image outputs found.", ""
             except Exception:
                 pass
-            _time.sleep(2)
+            await asyncio.sleep(delay)
+            delay = min(2.0, delay * 1.5)
 
         return "", f"ComfyUI timed out after {poll_timeout}s. prompt_id={prompt_id}"
 
+    @staticmethod
+    async def _wait_comfyui_done(ws, prompt_id: str):
+        """Consume ComfyUI websocket messages until prompt_id finishes executing."""
+        while True:
+            raw = await ws.recv()
+            if not isinstance(raw, str):
+                continue  # binary frames are live previews
+            msg = json.loads(raw)
+            if msg.get("type") != "executing":
+                continue
+            data = msg.get("data", {})
+            if data.get("prompt_id") == prompt_id and data.get("node") is None:
+                return
+
+    async def _run(self, argv: List[str], input: bytes = None, timeout: float = None,
+                   text: bool = False, check: bool = False,
+                   env: Dict = None) -> subprocess.CompletedProcess:
+        """Non-blocking stand-in for subprocess.run(argv, capture_output=True, ...).
+
+        Keeps the event loop free while the child runs; raises the same
+        TimeoutExpired / CalledProcessError as subprocess.run.
+        """
+        proc = await asyncio.create_subprocess_exec(
+            *argv,
+            stdin=asyncio.subprocess.PIPE if input is not None else None,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=env,
+            # Python fds are non-inheritable by default (PEP 446), so skipping the
+            # fd-table sweep leaks nothing and lets CPython use posix_spawn
+            close_fds=False,
+        )
+        try:
+            out, err = await asyncio.wait_for(proc.communicate(input), timeout)
+        except asyncio.TimeoutError:
+            self._kill_quietly(proc)
+            await proc.communicate()  # drain, so a full pipe can't stall the wait
+            raise subprocess.TimeoutExpired(argv, timeout)
+        if text:
+            out = out.decode("utf-8", errors="replace")
+            err = err.decode("utf-8", errors="replace")
+        result = subprocess.CompletedProcess(argv, proc.returncode, out, err)
+        if check:
+            result.check_returncode()
+        return result
+
+    @staticmethod
+    def _kill_quietly(proc):
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+
     # ---- open_application (IMPROVED: proper macOS paths + verification) --
     async def open_application(self, app_name: str, foreground: bool = True) -> Tuple[str, str]:
         """Open a macOS application. Tries multiple path strategies."""
         try:
             # Strategy 1: Direct open -a (most reliable)
-            cmd = ["open", "-a", app_name]
+            cmd = [self._tool_paths["open"], "-a", app_name]
             if not foreground:
                 cmd.append("-g")
-            proc = subprocess.run(cmd, capture_output=True, text=True, timeout=15)
+            proc = await self._run(cmd, text=True, timeout=15)
 
             if proc.returncode == 0:
                 self.log_tool_call("open_application", {"app": app_name}, "opened")
@@ -729,12 +1141,15 @@ class ToolsSystem:
             search_dirs = ["/Applications", os.path.expanduser("~/Applications")]
 
             for search_dir in search_dirs:
+                # Case-insensitive, like the APFS lookup the old exists() probe relied on
+                _, by_lower = self._app_listing(search_dir)
                 for variant in name_variants:
-                    app_path = f"{search_dir}/{variant}.app"
-                    if os.path.exists(app_path):
-                        proc = subprocess.run(
-                            ["open", app_path] + (["-g"] if not foreground else []),
-                            capture_output=True, text=True, timeout=15,
+                    bundle = by_lower.get(variant.lower())
+                    if bundle:
+                        app_path = f"{search_dir}/{bundle}.app"
+                        proc = await self._run(
+                            [self._tool_paths["open"], app_path] + (["-g"] if not foreground else []),
+                            text=True, timeout=15,
                         )
                         if proc.returncode == 0:
                             self.log_tool_call("open_application", {"app": app_name, "path": app_path}, "opened")
@@ -742,16 +1157,16 @@ class ToolsSystem:
 
             # Strategy 3: Use mdfind to locate the app
             try:
-                find_proc = subprocess.run(
-                    ["mdfind", "kMDItemKind == 'Application' && kMDItemDisplayName == '{}'".format(
+                find_proc = await self._run(
+                    [self._tool_paths["mdfind"], "kMDItemKind == 'Application' && kMDItemDisplayName == '{}'".format(
                         app_name.replace("'", "\\'"))],
-                    capture_output=True, text=True, timeout=10,
+                    text=True, timeout=10,
                 )
                 if find_proc.stdout.strip():
                     app_path = find_proc.stdout.strip().split("\n")[0]
-                    proc = subprocess.run(
-                        ["open", app_path] + (["-g"] if not foreground else []),
-                        capture_output=True, text=True, timeout=15,
+                    proc = await self._run(
+                        [self._tool_paths["open"], app_path] + (["-g"] if not foreground else []),
+                        text=True, timeout=15,
                     )
                     if proc.returncode == 0:
                         self.log_tool_call("open_application", {"app": app_name, "path": app_path}, "opened via mdfind")
@@ -760,41 +1175,99 @@ class ToolsSystem:
                 pass
 
             # Strategy 4: Check if it's a direct executable path
-            if os.path.exists(app_name):
-                proc = subprocess.run(
-                    ["open", app_name] + (["-g"] if not foreground else []),
-                    capture_output=True, text=True, timeout=15,
+            if self._stat_cached(app_name) is not None:
+                proc = await self._run(
+                    [self._tool_paths["open"], app_name] + (["-g"] if not foreground else []),
+                    text=True, timeout=15,
                 )
                 if proc.returncode == 0:
                     return f"Opened {app_name}", ""
 
             # All strategies failed
             available = []
+            needle = app_name.lower()
             for search_dir in search_dirs:
-                if os.path.exists(search_dir):
-                    apps = [f.replace(".app", "") for f in os.listdir(search_dir) if f.endswith(".app")]
-                    matches = [a for a in apps if app_name.lower() in a.lower()]
-                    available.extend(matches[:5])
+                _, by_lower = self._app_listing(search_dir)
+                # Stop at the first 5 matches per dir instead of filtering the whole listing
+                available.extend(islice((name for low, name in by_lower.items() if needle in low), 5))
 
             hint = f" Similar apps found: {', '.join(available)}" if available else ""
             return "", f"Failed to open '{app_name}'.{hint}"
         except Exception as e:
             return "", f"Open error: {e}"
 
+    # LLM retries of a wrong name hit the same missing paths within seconds
+    _NEG_PATH_TTL = 2.0
+    _NEG_PATH_MAX = 256
+
+    def _stat_cached(self, path: str) -> Optional[os.stat_result]:
+        """os.stat() that remembers misses briefly, so repeated probes of a missing path skip the syscall."""
+        now = time.monotonic()
+        missed_at = self._neg_path_cache.get(path)
+        if missed_at is not None:
+            if now - missed_at < self._NEG_PATH_TTL:
+                # LRU order: a hit keeps the entry from being the next one evicted
+                self._neg_path_cache.move_to_end(path)
+                return None
+            del self._neg_path_cache[path]
+        try:
+            return os.stat(path)
+        except (OSError, ValueError):
+            self._neg_path_cache[path] = now
+            if len(self._neg_path_cache) > self._NEG_PATH_MAX:
+                self._neg_path_cache.popitem(last=False)  # least recently used
+            return None
+
+    def _app_listing(self, search_dir: str) -> Tuple[set, Dict[str, str]]:
+        """App bundle names (without .app) in search_dir, cached until the dir's mtime changes.
+
+        Returns (names, {lowercased_name: name}).
+        """
+        st = self._stat_cached(search_dir)
+        if st is None:
+            return set(), {}
+        mtime = st.st_mtime_ns
+        cached = self._apps_cache.get(search_dir)
+        if cached and cached[0] == mtime:
+            return cached[1], cached[2]
+        names = set()
+        try:
+            with os.scandir(search_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(".app"):
+                        names.add(entry.name[:-4])
+        except OSError:
+            return set(), {}
+        by_lower = {n.lower(): n for n in names}
+        self._apps_cache[search_dir] = (mtime, names, by_lower)
+        return names, by_lower
+
     # ---- github_operations -----------------------------------------------
+    # Sent with every GitHub REST call; the pooled self._http session supplies keep-alive
+    _GITHUB_API_HEADERS = {"Accept": "application/vnd.github+json"}
+    # Exit codes of the batched /bin/sh push chain -> failing git step
+    _GIT_PUSH_STEPS = {101: "add", 102: "commit", 103: "push"}
+
     async def github_operations(self, action: str, repo_name: str = None, token: str = None) -> Tuple[str, str]:
         if not repo_name:
             return "", "repo_name is required."
         try:
             if action == "create":
-                headers = {}
+                if time.time() < self._github_reset_at:
+                    # Quota is spent: fail locally instead of spending a round-trip on a 403
+                    reset = datetime.fromtimestamp(self._github_reset_at).strftime("%H:%M:%S")
+                    return "", f"GitHub API rate limit exhausted; resets at {reset}."
+                headers = self._GITHUB_API_HEADERS
                 if token:
-                    headers["Authorization"] = f"token {token}"
-                resp = requests.post(
+                    headers = {**headers, "Authorization": f"token {token}"}
+                resp = await asyncio.to_thread(
+                    self._http.post,
                     "https://api.github.com/user/repos",
                     json={"name": repo_name, "private": True},
                     headers=headers, timeout=15,
                 )
+                if resp.headers.get("X-RateLimit-Remaining") == "0":
+                    self._github_reset_at = float(resp.headers.get("X-RateLimit-Reset", 0))
                 resp.raise_for_status()
                 return f"Created private repo: {repo_name}", ""
             elif action == "clone":
@@ -802,24 +1275,46 @@ class ToolsSystem:
                 if dest.exists():
                     return "", f"Already exists: {dest}"
                 user = os.environ.get("GITHUB_USERNAME", "bengur")
-                subprocess.run(
-                    ["git", "clone", f"https://github.com/{user}/{repo_name}.git", str(dest)],
-                    check=True, capture_output=True, text=True,
+                await self._run(
+                    [self._tool_paths["git"], "clone", f"https://github.com/{user}/{repo_name}.git", str(dest)],
+                    check=True, text=True,
                 )
                 return f"Cloned -> {dest}", ""
             elif action == "push":
                 repo_dir = self.projects_dir / repo_name
                 if not (repo_dir / ".git").exists():
                     return "", f"{repo_name} is not a git repo."
-                subprocess.run(["git", "-C", str(repo_dir), "add", "."], check=True)
-                subprocess.run(
-                    ["git", "-C", str(repo_dir), "commit", "-m", "Update from LLTimmy"],
-                    check=True, capture_output=True, text=True,
-                )
-                subprocess.run(
-                    ["git", "-C", str(repo_dir), "push"],
-                    check=True, capture_output=True, text=True,
+                if pygit2 is not None and await asyncio.to_thread(self._pygit2_can_commit, repo_dir):
+                    # Stage + commit in-process; push stays on the git CLI so the
+                    # user's credential helper / SSH agent are used as usual
+                    try:
+                        committed = await asyncio.to_thread(self._pygit2_commit, repo_dir, "Update from LLTimmy")
+                    except (pygit2.GitError, KeyError) as e:
+                        # e.g. no user.name/user.email configured for default_signature
+                        return "", f"Git error (git commit): {e}"
+                    if not committed:
+                        # Same outcome as the CLI chain, whose `git commit` fails here
+                        return "", "Git error (git commit): nothing to commit, working tree clean"
+                    await self._run(
+                        [self._tool_paths["git"], "-C", str(repo_dir), "push"],
+                        check=True, text=True,
+                    )
+                    return f"Pushed {repo_name}", ""
+                # One shell, one fork/exec chain: add, commit, push (stops at the first failure,
+                # whose exit code names the step)
+                git = f"{shlex.quote(self._tool_paths['git'])} -C {shlex.quote(str(repo_dir))}"
+                proc = await self._run(
+                    ["/bin/sh", "-c",
+                     f"{git} add . || exit 101; "
+                     f'{git} commit -m "Update from LLTimmy" || exit 102; '
+                     f"{git} push || exit 103"],
+                    text=True,
                 )
+                if proc.returncode != 0:
+                    step = self._GIT_PUSH_STEPS.get(proc.returncode, "push")
+                    # `nothing to commit` goes to stdout, so fall back to it
+                    detail = (proc.stderr or proc.stdout).strip()
+                    return "", f"Git error (git {step}): {detail}"
                 return f"Pushed {repo_name}", ""
             else:
                 return "", f"Unknown action: {action}"
@@ -828,25 +1323,70 @@ class ToolsSystem:
         except Exception as e:
             return "", f"GitHub error: {e}"
 
+    # Hooks `git commit` runs that a libgit2 commit would silently skip
+    _GIT_COMMIT_HOOKS = ("pre-commit", "prepare-commit-msg", "commit-msg", "post-commit")
+
+    def _pygit2_repo(self, repo_dir: Path) -> "pygit2.Repository":
+        key = str(repo_dir)
+        repo = self._git_repos.get(key)
+        if repo is None:
+            repo = self._git_repos[key] = pygit2.Repository(key)
+        return repo
+
+    def _pygit2_can_commit(self, repo_dir: Path) -> bool:
+        """False when `git commit` would sign or run hooks, which libgit2 does not; use the CLI then."""
+        try:
+            repo = self._pygit2_repo(repo_dir)
+            config = repo.config
+            if "commit.gpgsign" in config and config.get_bool("commit.gpgsign"):
+                return False
+            hooks_dir = Path(repo.path) / "hooks"
+            if "core.hooksPath" in config:
+                hooks_dir = Path(repo.workdir or repo.path) / os.path.expanduser(config["core.hooksPath"])
+            return not any(os.access(hooks_dir / name, os.X_OK) for name in self._GIT_COMMIT_HOOKS)
+        except (pygit2.GitError, ValueError):
+            return False
+
+    def _pygit2_commit(self, repo_dir: Path, message: str) -> bool:
+        """`git add . && git commit -m message` via libgit2. Returns False if the tree was unchanged."""
+        repo = self._pygit2_repo(repo_dir)
+        index = repo.index
+        index.read()  # pick up changes made by the git CLI since the last call
+        index.add_all()
+        index.write()
+        tree = index.write_tree()
+        if repo.head_is_unborn:
+            if len(index) == 0:
+                return False
+            parents = []
+        else:
+            head = repo.head.peel(pygit2.Commit)
+            if head.tree_id == tree:
+                return False
+            parents = [head.id]
+        sig = repo.default_signature
+        repo.create_commit("HEAD", sig, sig, message, tree, parents)
+        return True
+
     # ---- da_vinci_resolve_script -----------------------------------------
+    # Safety: reject scripts with sandbox-escape tokens.
+    # Substring checks for dunder and class introspection
+    _BANNED_SUBSTR_RE = re.compile("|".join(map(re.escape, (
+        "__", "subprocess", " os.", "builtins", "subclasses", "mro",
+    ))))
+    # Word-boundary checks to reduce false positives (e.g. "imported")
+    _BANNED_WORDS_RE = re.compile(
+        r"\b(?:import|exec|eval|open|getattr|setattr|delattr|globals|locals"
+        r"|compile|vars|type|bases)\b"
+    )
+
     async def da_vinci_resolve_script(self, script: str) -> Tuple[str, str]:
         try:
-            import importlib
             dvr = importlib.import_module("DaVinciResolveScript")
             resolve = dvr.scriptapp("Resolve")
             if resolve is None:
                 return "", "DaVinci Resolve is not running."
-            # Safety: reject scripts with sandbox-escape tokens
-            # Substring checks for dunder and class introspection
-            BANNED_SUBSTR = ("__", "subprocess", " os.", "builtins", "subclasses", "mro")
-            # Word-boundary checks to reduce false positives (e.g. "imported")
-            BANNED_WORDS = (r'\bimport\b', r'\bexec\b', r'\beval\b', r'\bopen\b',
-                            r'\bgetattr\b', r'\bsetattr\b', r'\bdelattr\b',
-                            r'\bglobals\b', r'\blocals\b', r'\bcompile\b',
-                            r'\bvars\b', r'\btype\b', r'\bbases\b')
-            if any(tok in script for tok in BANNED_SUBSTR):
-                return "", "Script contains unsafe tokens — rejected."
-            if any(re.search(pat, script) for pat in BANNED_WORDS):
+            if self._BANNED_SUBSTR_RE.search(script) or self._BANNED_WORDS_RE.search(script):
                 return "", "Script contains unsafe tokens — rejected."
             # Restricted evaluation — builtins disabled, only `resolve` in scope
             result = eval(script, {"__builtins__": {}, "resolve": resolve})  # noqa: S307  # nosec
@@ -861,18 +1401,17 @@ class ToolsSystem:
         """Write a new tool to sandbox for testing before integration."""
         try:
             # Sanitize tool name to prevent path injection
-            safe_name = re.sub(r'[^a-zA-Z0-9_]', '', name)
+            safe_name = _SAFE_NAME_RE.sub("", name)
             if not safe_name:
                 return "", "Invalid tool name. Use only alphanumeric characters and underscores."
             tool_path = self.projects_dir / f"tool_{safe_name}.py"
             tool_path.write_text(code, encoding="utf-8")
-            # Use py_compile for safe syntax checking (no string embedding)
-            proc = subprocess.run(
-                [self._venv_python, "-m", "py_compile", str(tool_path)],
-                capture_output=True, text=True, timeout=10,
-            )
-            if proc.returncode != 0:
-                return "", f"Syntax error in new tool:\n{proc.stderr}"
+            self._neg_path_cache.clear()
+            # py_compile only parses (never executes); in-process, so no interpreter spawn
+            try:
+                py_compile.compile(str(tool_path), doraise=True)
+            except py_compile.PyCompileError as e:
+                return "", f"Syntax error in new tool:\n{e.msg}"
             self.log_tool_call("create_tool", {"name": name}, "created")
             return f"Tool '{name}' created at {tool_path}. Syntax OK. Propose to Doctor for integration.", ""
         except Exception as e:
@@ -883,13 +1422,13 @@ class ToolsSystem:
         """Send a macOS notification via osascript."""
         try:
             # Escape quotes and backslashes for AppleScript safety
-            safe_title = title.replace('\\', '\\\\').replace('"', '\\"')
-            safe_msg = message.replace('\\', '\\\\').replace('"', '\\"')
+            safe_title = title.translate(_APPLESCRIPT_ESCAPE)
+            safe_msg = message.translate(_APPLESCRIPT_ESCAPE)
             sound_str = 'sound name "Funk"' if sound else ""
             script = f'display notification "{safe_msg}" with title "{safe_title}" {sound_str}'
-            proc = subprocess.run(
-                ["osascript", "-e", script],
-                capture_output=True, text=True, timeout=10,
+            proc = await self._run(
+                [self._tool_paths["osascript"], "-e", script],
+                text=True, timeout=10,
             )
             if proc.returncode != 0:
                 return "", f"Notification error: {proc.stderr}"
@@ -901,12 +1440,26 @@ class ToolsSystem:
     async def read_clipboard(self) -> Tuple[str, str]:
         """Read the current macOS clipboard contents."""
         try:
-            proc = subprocess.run(
-                ["pbpaste"], capture_output=True, timeout=5,
+            # Read at most 32KB (>= 8000 chars of UTF-8) — a huge clipboard is never fully buffered
+            proc = await asyncio.create_subprocess_exec(
+                self._tool_paths["pbpaste"], stdout=asyncio.subprocess.PIPE,
             )
-            content = proc.stdout.decode("utf-8", errors="replace")
+            try:
+                raw = await asyncio.wait_for(proc.stdout.readexactly(32768), 5)
+            except asyncio.IncompleteReadError as e:
+                raw = e.partial  # hit EOF: the whole clipboard fit under the cap
+            except asyncio.TimeoutError:
+                self._kill_quietly(proc)
+                await proc.communicate()
+                raise subprocess.TimeoutExpired([self._tool_paths["pbpaste"]], 5)
+            else:
+                self._kill_quietly(proc)  # cap reached; don't let pbpaste stream the rest
+            # communicate(), not wait(): drains the (bounded) leftover pipe data, otherwise
+            # the paused stdout transport never sees EOF and wait() hangs
+            await proc.communicate()
+            content = raw.decode("utf-8", errors="replace")[:8000]
             self.log_tool_call("read_clipboard", {}, f"({len(content)} chars read)")
-            return content[:8000] or "(clipboard is empty)", ""
+            return content or "(clipboard is empty)", ""
         except Exception as e:
             return "", f"Clipboard read error: {e}"
 
@@ -914,9 +1467,9 @@ class ToolsSystem:
     async def write_clipboard(self, content: str) -> Tuple[str, str]:
         """Write content to the macOS clipboard."""
         try:
-            proc = subprocess.run(
-                ["pbcopy"], input=content.encode("utf-8"),
-                capture_output=True, timeout=5,
+            proc = await self._run(
+                [self._tool_paths["pbcopy"]], input=content.encode("utf-8"),
+                timeout=5,
             )
             if proc.returncode != 0:
                 return "", f"Clipboard write error: {proc.stderr.decode()}"
@@ -1041,6 +1594,29 @@ class ToolsSystem:
         },
     }
 
+    # Templates parsed once into (literal, field_name) segments; see _compile_templates
+    _COMPILED_TEMPLATES: Optional[Dict[str, List[Tuple[tuple, tuple]]]] = None
+
+    @classmethod
+    def _compile_templates(cls) -> Dict[str, List[Tuple[tuple, tuple]]]:
+        """Parse every scaffold path/content template once (doubled braces already unescaped)."""
+        if cls._COMPILED_TEMPLATES is None:
+            parse = string.Formatter().parse
+
+            def _segments(tpl: str) -> tuple:
+                return tuple((lit, field) for lit, field, _spec, _conv in parse(tpl))
+
+            cls._COMPILED_TEMPLATES = {
+                pt: [(_segments(path_tpl), _segments(content_tpl))
+                     for path_tpl, content_tpl in files.items()]
+                for pt, files in cls._SCAFFOLD_TEMPLATES.items()
+            }
+        return cls._COMPILED_TEMPLATES
+
+    @staticmethod
+    def _render_template(segments: tuple, subs: Dict[str, str]) -> str:
+        return "".join(lit + subs[field] if field else lit for lit, field in segments)
+
     async def scaffold_project(self, project_type: str, name: str,
                                 dest_dir: str = None) -> Tuple[str, str]:
         """Create a complete project scaffold from a template."""
@@ -1049,29 +1625,37 @@ class ToolsSystem:
             available = ", ".join(self._SCAFFOLD_TEMPLATES.keys())
             return "", f"Unknown project type '{project_type}'. Available: {available}"
 
-        snake_name = re.sub(r'[^a-z0-9_]+', '_', name.lower()).strip('_') or "project"
+        snake_name = _SNAKE_RE.sub("_", name.lower()).strip('_') or "project"
         class_name = "".join(w.capitalize() for w in snake_name.split('_'))
 
-        template = self._SCAFFOLD_TEMPLATES[pt]
+        template = self._compile_templates()[pt]
+        subs = {"name": name, "snake_name": snake_name, "class_name": class_name}
         dest = Path(os.path.expanduser(dest_dir)).resolve() if dest_dir else (self.projects_dir / snake_name)
         # Safety: block system paths
         dest_str = str(dest)
-        for banned in self.risk_engine.BANNED_PATHS:
-            if dest_str.startswith(os.path.expanduser(banned)):
-                return "", f"BLOCKED: Cannot scaffold into {banned}"
+        prefixes = self.risk_engine.banned_prefixes
+        if dest_str.startswith(prefixes):
+            banned = next(b for b, pre in zip(self.risk_engine.BANNED_PATHS, prefixes)
+                          if dest_str.startswith(pre))
+            return "", f"BLOCKED: Cannot scaffold into {banned}"
         dest.mkdir(parents=True, exist_ok=True)
 
+        files = []
+        for path_segments, content_segments in template:
+            rel_path = self._render_template(path_segments, subs)
+            content = self._render_template(content_segments, subs)
+            files.append((dest / rel_path, content.encode("utf-8")))
+        # Create each directory once (shallowest first), then write all files concurrently
+        for d in sorted({fp.parent for fp, _ in files}, key=lambda d: len(d.parts)):
+            d.mkdir(parents=True, exist_ok=True)
+        await asyncio.gather(*(asyncio.to_thread(_fast_write, str(fp), data) for fp, data in files))
         created_files = []
-        for rel_path_tpl, content_tpl in template.items():
-            rel_path = rel_path_tpl.format(snake_name=snake_name, class_name=class_name, name=name)
-            content = content_tpl.format(name=name, snake_name=snake_name, class_name=class_name)
-            file_path = dest / rel_path
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-            file_path.write_text(content, encoding="utf-8")
-            created_files.append(str(file_path.relative_to(dest)))
+        for fp, _ in files:
+            insort(created_files, str(fp.relative_to(dest)))
+        self._neg_path_cache.clear()
 
         self.log_tool_call("scaffold_project", {"type": pt, "name": name}, str(dest))
-        manifest = "\n".join(f"  {f}" for f in sorted(created_files))
+        manifest = "\n".join(f"  {f}" for f in created_files)
         return f"Project '{name}' scaffolded at {dest}:\n{manifest}", ""
 
     # ---- streaming terminal -----------------------------------------------
@@ -1079,8 +1663,6 @@ class ToolsSystem:
                                        stream_callback=None,
                                        timeout: int = 300) -> Tuple[str, str]:
         """Run a long command with live output streaming."""
-        import asyncio
-
         safe, reason = self.risk_engine.check_banned_paths(command)
         if not safe:
             return "", f"BLOCKED: {reason}"
@@ -1099,22 +1681,48 @@ class ToolsSystem:
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.STDOUT,
         )
-        lines = []
+        # Only the last 10000 chars are returned; every line is >= 1 char incl. its
+        # newline, so keeping 10000 lines is always enough and bounds memory
+        lines = deque(maxlen=10000)
+
+        def _emit(batch):
+            batch = [line.rstrip() for line in batch]
+            lines.extend(batch)
+            if stream_callback:
+                for line in batch:
+                    try:
+                        stream_callback(line)
+                    except Exception:
+                        pass
+
         try:
             async def _read_all():
-                async for raw_line in proc.stdout:
-                    line = raw_line.decode("utf-8", errors="replace").rstrip()
-                    lines.append(line)
-                    if stream_callback:
-                        try:
-                            stream_callback(line)
-                        except Exception:
-                            pass
+                # Bulk reads + incremental decode (safe across UTF-8 boundaries),
+                # split into lines per chunk rather than one readline() per line
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                pending = ""
+                while True:
+                    chunk = await proc.stdout.read(65536)
+                    if not chunk:
+                        break
+                    text = pending + decoder.decode(chunk)
+                    # Hold back a trailing \r in case the next chunk starts with its \n
+                    held = "\r" if text.endswith("\r") else ""
+                    # \r counts as a break too: progress bars (ffmpeg, curl, renders) redraw
+                    # with it and may never emit \n
+                    *complete, pending = _LINE_BREAK_RE.split(text[:len(text) - len(held)])
+                    if complete:
+                        _emit(complete)
+                    # A single unbroken line is truncated to what could be returned anyway
+                    pending = pending[-10000:] + held
+                pending += decoder.decode(b"", final=True)
+                if pending:
+                    _emit([pending])
                 await proc.wait()
             await asyncio.wait_for(_read_all(), timeout=timeout)
         except asyncio.TimeoutError:
             proc.kill()
-            return "\n".join(lines[-50:]), f"Timed out after {timeout}s"
+            return "\n".join(list(lines)[-50:]), f"Timed out after {timeout}s"
 
         output = "\n".join(lines)
         self.log_tool_call("terminal_command_stream", {"command": command}, output[-500:])
@@ -1124,101 +1732,110 @@ class ToolsSystem:
         return output[-10000:] or "(completed, no output)", ""
 
     # ---- capture_screenshot (NEW: UI diagnostic tool) --------------------
-    async def capture_screenshot(self, target: str = "desktop", save_path: str = None) -> Tuple[str, str]:
+    # UI targets: name -> (local port, window title to crop to: app.py Tk root / Doctor's Gradio page)
+    _SCREENSHOT_UIS = {"timmy": (7860, "LLTimmy"), "doctor": (7861, "LLTimmy Doctor")}
+    # Windows rarely move; reuse looked-up bounds for this many seconds
+    _WINDOW_BOUNDS_TTL = 10.0
+
+    async def _window_region(self, title: str) -> Optional[str]:
+        """`screencapture -R` region for the window titled `title`, or None if not found."""
+        now = time.monotonic()
+        hit = self._window_bounds_cache.get(title)
+        if hit is not None and now - hit[0] < self._WINDOW_BOUNDS_TTL:
+            return hit[1]
+        try:
+            proc = await self._run(
+                [self._tool_paths["osascript"], "-e", _WINDOW_BOUNDS_SCRIPT, title],
+                text=True, timeout=5,
+            )
+        except (subprocess.TimeoutExpired, OSError):
+            return None
+        region = proc.stdout.strip() if proc.returncode == 0 else ""
+        if not region:
+            return None  # misses aren't cached: the window may open any moment
+        self._window_bounds_cache[title] = (now, region)
+        return region
+
+    async def _playwright_shot(self, url: str, dest: str, ready_selector: str = "body") -> Tuple[bool, str]:
+        """Screenshot `url` to `dest` with Playwright. Returns (ok, error text)."""
+        try:
+            if async_playwright is not None:
+                # Shared browser: no interpreter/Chromium cold start per screenshot
+                await self._browser_screenshot(url, dest, ready_selector)
+                return True, ""
+            # Venv-only Playwright: URL/path go via env vars, not string embedding (Critic #6)
+            # Prepend this directory; the venv may rely on an existing PYTHONPATH
+            pythonpath = os.pathsep.join(filter(None, [_MODULE_DIR, os.environ.get("PYTHONPATH")]))
+            env = {**os.environ, "PYTHONPATH": pythonpath,
+                   "PW_URL": url, "PW_DEST": dest, "PW_SELECTOR": ready_selector}
+            proc = await self._run([self._venv_python, "-m", _PW_SHOT_MODULE], timeout=30, env=env)
+            if proc.returncode == 0:
+                return True, ""
+            return False, proc.stderr.decode(errors="replace")
+        except Exception as e:
+            return False, str(e)
+
+    async def capture_screenshot(self, target: str = "desktop", save_path: str = None,
+                                 fmt: str = None) -> Tuple[str, str]:
         """Capture a screenshot for diagnostic purposes.
 
         Args:
             target: "desktop" for full screen, "timmy" for Timmy UI (port 7860),
                     or a URL/window name.
             save_path: Optional path to save screenshot. Default: ~/LLTimmy/screenshots/
+            fmt: "png" or "jpg"/"jpeg" (any case) for the default filename; ignored when save_path is given
+                 (its extension decides). Defaults to jpg for the timmy/doctor diagnostics,
+                 where legibility matters more than lossless pixels, png otherwise.
         """
+        if fmt and fmt.lower() not in ("png", "jpg", "jpeg"):
+            return "", f"Screenshot error: unsupported format '{fmt}'. Use png or jpg."
         try:
-            screenshots_dir = Path.home() / "LLTimmy" / "screenshots"
-            screenshots_dir.mkdir(parents=True, exist_ok=True)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = save_path or str(screenshots_dir / f"screenshot_{timestamp}.png")
-
-            if target == "desktop":
-                # macOS screencapture for full desktop
-                proc = subprocess.run(
-                    ["screencapture", "-x", filename],
-                    capture_output=True, text=True, timeout=10,
-                )
-                if proc.returncode != 0:
-                    return "", f"Screenshot error: {proc.stderr}"
-                return f"Desktop screenshot saved to {filename}", ""
-
-            elif target in ("timmy", "doctor"):
-                port = 7860 if target == "timmy" else 7861
-                url = f"http://127.0.0.1:{port}"
-                # Try Playwright (FIXED: pass URL/path via env vars, not string embedding — Critic #6)
-                try:
-                    pw_script = (
-                        "import asyncio, sys, os\n"
-                        "from playwright.async_api import async_playwright\n"
-                        "async def shot():\n"
-                        "    url = os.environ['PW_URL']\n"
-                        "    dest = os.environ['PW_DEST']\n"
-                        "    async with async_playwright() as p:\n"
-                        "        browser = await p.chromium.launch(headless=True)\n"
-                        "        page = await browser.new_page(viewport={'width': 1280, 'height': 900})\n"
-                        "        await page.goto(url, wait_until='networkidle', timeout=15000)\n"
-                        "        await page.wait_for_timeout(2000)\n"
-                        "        await page.screenshot(path=dest, full_page=True)\n"
-                        "        await browser.close()\n"
-                        "asyncio.run(shot())\n"
-                    )
-                    env = {**os.environ, "PW_URL": url, "PW_DEST": filename}
-                    proc = subprocess.run(
-                        [self._venv_python, "-c", pw_script],
-                        capture_output=True, text=True, timeout=30, env=env,
-                    )
-                    if proc.returncode == 0:
-                        return f"UI screenshot of {target} saved to {filename}", ""
-                    logger.warning(f"Playwright screenshot failed: {proc.stderr[:200]}")
-                except Exception as e:
-                    logger.warning(f"Playwright unavailable: {e}")
-
-                # Fallback: capture desktop
-                proc = subprocess.run(
-                    ["screencapture", "-x", filename],
-                    capture_output=True, text=True, timeout=10,
-                )
-                if proc.returncode == 0:
-                    return f"Desktop screenshot saved to {filename} (Playwright unavailable for direct UI capture)", ""
-                return "", f"Screenshot failed: {proc.stderr}"
+            if save_path:
+                filename = save_path
             else:
-                # Treat target as a URL (FIXED: pass via env vars — Critic #6)
-                try:
-                    pw_script = (
-                        "import asyncio, os\n"
-                        "from playwright.async_api import async_playwright\n"
-                        "async def shot():\n"
-                        "    url = os.environ['PW_URL']\n"
-                        "    dest = os.environ['PW_DEST']\n"
-                        "    async with async_playwright() as p:\n"
-                        "        browser = await p.chromium.launch(headless=True)\n"
-                        "        page = await browser.new_page(viewport={'width': 1280, 'height': 900})\n"
-                        "        await page.goto(url, wait_until='networkidle', timeout=15000)\n"
-                        "        await page.wait_for_timeout(2000)\n"
-                        "        await page.screenshot(path=dest, full_page=True)\n"
-                        "        await browser.close()\n"
-                        "asyncio.run(shot())\n"
-                    )
-                    env = {**os.environ, "PW_URL": target, "PW_DEST": filename}
-                    proc = subprocess.run(
-                        [self._venv_python, "-c", pw_script],
-                        capture_output=True, text=True, timeout=30, env=env,
-                    )
-                    if proc.returncode == 0:
-                        return f"Screenshot of {target} saved to {filename}", ""
-                    return "", f"Screenshot error: {proc.stderr[:300]}"
-                except Exception as e:
-                    return "", f"Screenshot error: {e}"
-
+                ext = fmt.lower() if fmt else ("jpg" if target in self._SCREENSHOT_UIS else "png")
+                filename = str(self._screenshots_dir / f"screenshot_{time.time_ns()}_{next(self._shot_counter)}.{ext}")
+            # screencapture writes PNG unless told otherwise
+            capture = [self._tool_paths["screencapture"], "-x"] + (["-t", "jpg"] if _is_jpeg(filename) else [])
+
+            # Named targets dispatch by table; anything else is treated as a URL
+            handler = self._SCREENSHOT_HANDLERS.get(target, ToolsSystem._shot_url)
+            return await handler(self, target, filename, capture)
         except Exception as e:
             return "", f"Screenshot error: {e}"
 
+    async def _shot_desktop(self, target: str, filename: str, capture: List[str]) -> Tuple[str, str]:
+        # macOS screencapture for full desktop
+        proc = await self._run(capture + [filename], text=True, timeout=10)
+        if proc.returncode != 0:
+            return "", f"Screenshot error: {proc.stderr}"
+        return f"Desktop screenshot saved to {filename}", ""
+
+    async def _shot_ui(self, target: str, filename: str, capture: List[str]) -> Tuple[str, str]:
+        port, window_title = self._SCREENSHOT_UIS[target]
+        ok, err = await self._playwright_shot(f"http://127.0.0.1:{port}", filename, _GRADIO_READY_SELECTOR)
+        if ok:
+            return f"UI screenshot of {target} saved to {filename}", ""
+        logger.warning(f"Playwright screenshot failed: {err[:200]}")
+
+        # Fallback: capture just the UI window if it is on screen, else the desktop
+        region = await self._window_region(window_title)
+        cmd = capture + ["-R", region] if region else capture
+        proc = await self._run(cmd + [filename], text=True, timeout=10)
+        if proc.returncode == 0:
+            what = f"Window screenshot of {target}" if region else "Desktop screenshot"
+            return f"{what} saved to {filename} (Playwright unavailable for direct UI capture)", ""
+        return "", f"Screenshot failed: {proc.stderr}"
+
+    async def _shot_url(self, target: str, filename: str, capture: List[str]) -> Tuple[str, str]:
+        ok, err = await self._playwright_shot(target, filename)
+        if ok:
+            return f"Screenshot of {target} saved to {filename}", ""
+        return "", f"Screenshot error: {err[:300]}"
+
+    # New named targets (specific windows, displays) plug in here
+    _SCREENSHOT_HANDLERS = {"desktop": _shot_desktop, "timmy": _shot_ui, "doctor": _shot_ui}
+
     # ---- browser_macro (Feature: Browser-Based Macros) --------------------
     async def browser_macro(self, steps: List[Dict], headless: bool = True) -> Tuple[str, str]:
         """Execute multi-step browser automation macro via Playwright.